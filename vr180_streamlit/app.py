@@ -1,9 +1,15 @@
+import os
+
+# Configure OpenCV's runtime before it is imported anywhere: disable OpenCL
+# probing (avoids per-call init jitter) and bound OpenMP to the core count
+os.environ.setdefault('OPENCV_OPENCL_RUNTIME', 'disabled')
+os.environ.setdefault('OMP_NUM_THREADS', str(os.cpu_count() or 1))
+
 import streamlit as st
 import cv2
 import numpy as np
-import os
+import shutil
 import tempfile
-from moviepy.editor import VideoFileClip
 from utils.video_processor import SimpleVRProcessor
 import time
 
@@ -93,7 +99,8 @@ def upload_interface():
 def analyze_video(uploaded_file):
     """Quick video analysis"""
     with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-        tmp_file.write(uploaded_file.read())
+        # Stream to disk in 1 MB chunks - never hold the whole upload in RAM
+        shutil.copyfileobj(uploaded_file, tmp_file, length=1024 * 1024)
         tmp_file_path = tmp_file.name
     
     try:
@@ -128,9 +135,10 @@ def process_video(uploaded_file):
     step_indicators = st.empty()
     
     try:
-        # Save uploaded file
+        # Save uploaded file, streaming in chunks so large uploads
+        # are never buffered twice in memory
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(uploaded_file.read())
+            shutil.copyfileobj(uploaded_file, tmp_file, length=1024 * 1024)
             input_path = tmp_file.name
         
         # Initialize processor
@@ -197,10 +205,12 @@ def result_interface():
     
     with col1:
         if st.session_state.output_file and os.path.exists(st.session_state.output_file):
+            # Hand Streamlit the open file so it streams the video out in
+            # chunks instead of loading the whole render into memory
             with open(st.session_state.output_file, 'rb') as file:
                 st.download_button(
                     label="📥 Download VR Video",
-                    data=file.read(),
+                    data=file,
                     file_name=f"vr180_converted_{int(time.time())}.mp4",
                     mime="video/mp4",
                     type="primary",
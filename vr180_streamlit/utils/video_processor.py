@@ -1,12 +1,111 @@
+import os
+
+import av
 import cv2
 import numpy as np
-import os
+import queue
 import tempfile
-from moviepy.editor import VideoFileClip
+import threading
+
+# The SSE/AVX kernels are compiled in either way - just make sure they are
+# enabled and parallelized across all cores, and skip OpenCL dispatch
+cv2.setUseOptimized(True)
+cv2.setNumThreads(os.cpu_count() or 1)
+cv2.ocl.setUseOpenCL(False)
+
+# Numba gives a big speedup on the per-pixel displacement math but is an
+# optional accelerator - the NumPy path below works without it
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# CUDA-enabled OpenCV builds can run the whole per-frame pipeline on GPU;
+# stock opencv-python wheels ship without it, so probe at import time
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
+
+# CuPy lets us fuse disparity + both remaps + side-by-side concat into one
+# CUDA kernel - one launch and one pass over the input per frame. Optional,
+# like the other accelerators (not listed in requirements - GPU hosts only).
+try:
+    import cupy as cp
+    CUPY_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    CUPY_AVAILABLE = False
+
+if CUPY_AVAILABLE:
+    # Per output pixel: pick the eye from x, shift by the signed disparity,
+    # bilinear-sample the source row and write straight into the VR frame
+    VR180_RENDER_KERNEL = cp.RawKernel(r'''
+    extern "C" __global__
+    void vr180_render(const unsigned char* frame, const unsigned char* depth,
+                      unsigned char* vr_out, int width, int height, float scale)
+    {
+        int x_out = blockIdx.x * blockDim.x + threadIdx.x;
+        int y = blockIdx.y * blockDim.y + threadIdx.y;
+        if (x_out >= 2 * width || y >= height) return;
+
+        int eye = x_out >= width;          /* 0 = left eye, 1 = right eye */
+        int xc = x_out - eye * width;
+        float sign = 1.0f - 2.0f * eye;
+        float xs = xc + depth[y * width + xc] * scale * sign;
+        xs = fminf((float)(width - 1), fmaxf(0.0f, xs));
+
+        int x0 = (int)xs;
+        int x1 = min(x0 + 1, width - 1);
+        float t = xs - x0;
+
+        const unsigned char* p0 = frame + (y * width + x0) * 3;
+        const unsigned char* p1 = frame + (y * width + x1) * 3;
+        unsigned char* dst = vr_out + (y * 2 * width + x_out) * 3;
+        for (int c = 0; c < 3; c++)
+            dst[c] = (unsigned char)(p0[c] + t * (p1[c] - p0[c]) + 0.5f);
+    }
+    ''', 'vr180_render')
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def build_shift_maps(depth, scale, x_left, x_right, y_map):
+        """Fused kernel: disparity scale, eye shifts, clip and y-grid in one pass"""
+        height, width = depth.shape
+        for y in prange(height):
+            for x in range(width):
+                d = depth[y, x] * scale
+                x_left[y, x] = min(width - 1.0, max(0.0, x + d))
+                x_right[y, x] = min(width - 1.0, max(0.0, x - d))
+                y_map[y, x] = y
 
 class SimpleVRProcessor:
     def __init__(self):
-        pass
+        # Cached coordinate grids and shift buffers, keyed by frame size
+        self._grids = {}
+        self._xL = None
+        self._xR = None
+        # 256-entry LUT mapping a uint8 depth level straight to its float32
+        # pixel shift - one gather instead of a cast plus multiply per pixel
+        max_disparity = 15  # Maximum pixel shift for depth effect
+        self._disparity_lut = np.arange(256, dtype=np.float32) * (max_disparity * 0.3 / 255.0)
+        # Reused intermediates for the depth combine, keyed by map size
+        self._depth_bufs = {}
+        # Scene depth varies slowly next to the frame rate, so refresh the
+        # depth map only every Kth frame and reuse it in between
+        self._depth_every = 3
+        self._frame_index = 0
+        self._last_depth = None
+        self._last_gpu_depth = None
+        # Frame size the shape-dependent state was built for
+        self._configured_shape = None
+        # GPU-resident coordinate grids for the CUDA path, plus lazily built
+        # filter engines and the stream all GPU work is issued on
+        self._gpu_grids = {}
+        self._cuda_filters = None
+        self._cuda_stream = None
+        # Device buffers for the fused CuPy render kernel
+        self._cp_bufs = {}
     
     def convert_to_vr180(self, input_path, progress_callback=None):
         """
@@ -17,167 +116,415 @@ class SimpleVRProcessor:
         # Create output path
         output_dir = tempfile.mkdtemp()
         output_path = os.path.join(output_dir, 'vr180_output.mp4')
-        temp_video_path = os.path.join(output_dir, 'temp_video.mp4')
-        
+
+        # Fresh conversion: never reuse depth state from a previous video
+        self._frame_index = 0
+        self._last_depth = None
+        self._last_gpu_depth = None
+
         try:
-            # Step 1: Load video
+            # Step 1: Load video (PyAV = multi-threaded FFmpeg decode)
             if progress_callback:
                 progress_callback(10, "Loading video...", 0)
-            
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
+
+            container = av.open(input_path)
+            in_video = container.streams.video[0]
+            # Let FFmpeg decode on all cores (frame + slice threading)
+            in_video.thread_type = 'AUTO'
+            in_video.codec_context.thread_count = os.cpu_count() or 1
+            in_audio = container.streams.audio[0] if container.streams.audio else None
+
+            fps = in_video.average_rate
+            width = in_video.codec_context.width
+            height = in_video.codec_context.height
+
+            # stream.frames is 0 when the container has no nb_frames metadata
+            # (MKV, notably) - fall back to an estimate from the stream or
+            # container duration
+            total_frames = in_video.frames
+            if not total_frames and fps:
+                if in_video.duration:
+                    total_frames = int(in_video.duration * in_video.time_base * fps)
+                elif container.duration:
+                    total_frames = int(container.duration / av.time_base * fps)
+            total_frames = max(total_frames, 1)
+
             # VR 180 dimensions (side-by-side stereoscopic)
             vr_width = width * 2  # Double width for left+right eye
             vr_height = height
-            
-            # Video writer for output - NO AUDIO YET
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(temp_video_path, fourcc, fps, (vr_width, vr_height))
-            
+
+            # Dimensions are known before the first frame, so build every
+            # shape-dependent buffer/grid/filter now - the hot loop then runs
+            # allocation-free
+            self._configure(height, width)
+
+            # Single h264 encode pass, audio copied packet-for-packet from the
+            # source - no separate MoviePy re-encode round-trip
+            output = av.open(output_path, 'w')
+            out_video = output.add_stream('h264', rate=fps)
+            out_video.width = vr_width
+            out_video.height = vr_height
+            out_video.pix_fmt = 'yuv420p'
+            out_audio = output.add_stream_from_template(in_audio) if in_audio else None
+
+            # Three-stage pipeline: decode and encode are I/O-bound while the
+            # depth/stereo math is CPU-bound, and OpenCV/FFmpeg release the
+            # GIL, so running them in separate threads overlaps all stages.
+            # Audio packets ride through the queues so ordering is preserved
+            # and all muxing stays on the main thread.
+            decode_q = queue.Queue(maxsize=8)
+            encode_q = queue.Queue(maxsize=8)
+
+            # Preallocated side-by-side output buffers, cycled by the
+            # processing thread. The pool exceeds the queue bound so a buffer
+            # is never reused before the writer has flushed it.
+            vr_pool = [np.empty((vr_height, vr_width, 3), np.uint8)
+                       for _ in range(encode_q.maxsize + 2)]
+
+            demux_streams = [s for s in (in_video, in_audio) if s is not None]
+
+            # Failures inside the worker threads land here and are re-raised
+            # on the main thread after the joins; the sentinels always go out
+            # so no stage can block forever on a queue
+            pipeline_errors = []
+
+            def decode_frames():
+                try:
+                    for packet in container.demux(demux_streams):
+                        if packet.stream is in_video:
+                            for frame in packet.decode():
+                                # The decoded frame is YUV, so 'gray' is just its
+                                # luma plane - far cheaper than a BGR2GRAY pass
+                                decode_q.put(('video',
+                                              (frame.to_ndarray(format='bgr24'),
+                                               frame.to_ndarray(format='gray'))))
+                        elif packet.dts is not None:
+                            decode_q.put(('audio', packet))
+                except Exception as exc:
+                    pipeline_errors.append(exc)
+                finally:
+                    decode_q.put(None)  # Sentinel: no more packets
+
+            BATCH = 8  # Frames processed per burst
+
+            def process_frames():
+                produced = 0
+                done = False
+                try:
+                    while not done:
+                        # Gather a burst of frames so the hot loop below runs
+                        # back-to-back over warm buffers without queue round-trips
+                        # per frame; audio packets pass straight through as seen
+                        batch = []
+                        while len(batch) < BATCH:
+                            item = decode_q.get()
+                            if item is None:
+                                done = True
+                                break
+                            kind, payload = item
+                            if kind == 'audio':
+                                encode_q.put(item)
+                                continue
+                            batch.append(payload)
+                        # Steps 2-4: depth + stereo render into the side-by-side
+                        # VR buffers (GPU when available, CPU otherwise)
+                        for frame, gray in batch:
+                            vr_frame = vr_pool[produced % len(vr_pool)]
+                            self.process_frame(frame, vr_frame, gray=gray)
+                            encode_q.put(('video', vr_frame))
+                            produced += 1
+                except Exception as exc:
+                    pipeline_errors.append(exc)
+                    # Drain the decoder's queue so its put() cannot block and
+                    # hang the join below
+                    while not done and decode_q.get() is not None:
+                        pass
+                finally:
+                    encode_q.put(None)
+
+            decoder = threading.Thread(target=decode_frames, daemon=True)
+            processor = threading.Thread(target=process_frames, daemon=True)
+            decoder.start()
+            processor.start()
+
+            # Main thread drains the pipeline into the muxer
             frame_count = 0
-            
-            # Process each frame
             while True:
-                ret, frame = cap.read()
-                if not ret:
+                item = encode_q.get()
+                if item is None:
                     break
-                
-                # Step 2: Estimate depth for this frame
-                if progress_callback and frame_count % 30 == 0:
-                    progress_callback(20 + (frame_count / total_frames) * 60, 
-                                    "Analyzing depth...", 1)
-                
-                depth_map = self.simple_depth_estimation(frame)
-                
-                # Step 3: Create left and right eye views
+                kind, payload = item
+
+                if kind == 'audio':
+                    payload.stream = out_audio
+                    output.mux(payload)
+                    continue
+
                 if progress_callback and frame_count % 30 == 0:
-                    progress_callback(20 + (frame_count / total_frames) * 60, 
-                                    "Creating stereo view...", 2)
-                
-                left_eye, right_eye = self.create_stereo_pair(frame, depth_map)
-                
-                # Step 4: Combine side-by-side for VR 180
-                vr_frame = np.hstack([left_eye, right_eye])
-                out.write(vr_frame)
-                
+                    # Clamp to the 20-80 band: an undercounted total must
+                    # never push st.progress past 100%
+                    progress = min(80, 20 + (frame_count / total_frames) * 60)
+                    progress_callback(progress, "Creating stereo view...", 2)
+
+                av_frame = av.VideoFrame.from_ndarray(payload, format='bgr24')
+                for packet in out_video.encode(av_frame):
+                    output.mux(packet)
                 frame_count += 1
-            
-            cap.release()
-            out.release()
-            
-            # Step 5: ADD AUDIO FROM ORIGINAL VIDEO
+
+            decoder.join()
+            processor.join()
+
+            # Surface whatever broke inside the pipeline threads
+            if pipeline_errors:
+                raise pipeline_errors[0]
+
+            # Step 5: Flush the encoder and finalize the container
             if progress_callback:
-                progress_callback(95, "Adding audio...", 3)
-            
-            # Use MoviePy to combine the processed video with original audio
-            original_clip = VideoFileClip(input_path)
-            processed_clip = VideoFileClip(temp_video_path)
-            
-            # Set the audio from original to processed video
-            if original_clip.audio is not None:
-                final_clip = processed_clip.set_audio(original_clip.audio)
-                
-                # Write final video with audio
-                final_clip.write_videofile(
-                    output_path,
-                    codec='libx264',
-                    audio_codec='aac',
-                    temp_audiofile='temp-audio.m4a',
-                    remove_temp=True,
-                    verbose=False,
-                    logger=None
-                )
-                
-                final_clip.close()
-            else:
-                # No audio in original, just move the temp file
-                os.rename(temp_video_path, output_path)
-            
-            # Cleanup
-            original_clip.close()
-            processed_clip.close()
-            if os.path.exists(temp_video_path):
-                os.remove(temp_video_path)
-            
+                progress_callback(95, "Finalizing video...", 3)
+
+            for packet in out_video.encode():
+                output.mux(packet)
+            output.close()
+            container.close()
+
             if progress_callback:
                 progress_callback(100, "Conversion complete!", 4)
-            
+
             return output_path
-            
+
         except Exception as e:
             # Cleanup on error
-            if os.path.exists(temp_video_path):
-                os.remove(temp_video_path)
+            if os.path.exists(output_path):
+                os.remove(output_path)
             raise Exception(f"Conversion failed: {str(e)}")
     
-    def simple_depth_estimation(self, frame):
+    def _configure(self, height, width):
+        """Build every shape-dependent object once, ahead of the first frame"""
+
+        if self._configured_shape == (height, width):
+            return
+        self._configured_shape = (height, width)
+
+        # CPU displacement grids and shift buffers
+        x_base = np.arange(width, dtype=np.float32)[None, :].repeat(height, axis=0)
+        y_map = np.arange(height, dtype=np.float32)[:, None].repeat(width, axis=1)
+        self._grids[(height, width)] = (x_base, y_map)
+        self._xL = np.empty((height, width), dtype=np.float32)
+        self._xR = np.empty((height, width), dtype=np.float32)
+
+        # Depth-path intermediates at the 4x downsampled size
+        small = (max(1, height // 4), max(1, width // 4))
+        self._depth_bufs[small] = (np.empty(small, np.uint8), np.empty(small, np.uint8))
+
+        if NUMBA_AVAILABLE:
+            # Warm the parallel kernel here, on the main thread: first-compiling
+            # it from the processing worker deadlocks Numba's default workqueue
+            # threading layer at interpreter shutdown
+            tiny = np.zeros((1, 1), np.float32)
+            build_shift_maps(np.zeros((1, 1), np.uint8), np.float32(0.0),
+                             tiny.copy(), tiny.copy(), tiny.copy())
+
+        if CUPY_AVAILABLE:
+            # Device buffers for the fused render kernel
+            self._cp_bufs[(height, width)] = (
+                cp.empty((height, width, 3), cp.uint8),
+                cp.empty((height, width), cp.uint8),
+                cp.empty((height, width * 2, 3), cp.uint8)
+            )
+        elif CUDA_AVAILABLE:
+            # GPU grids plus the cached filter engines and stream
+            gpu_x = cv2.cuda_GpuMat()
+            gpu_x.upload(x_base)
+            gpu_y = cv2.cuda_GpuMat()
+            gpu_y.upload(y_map)
+            self._gpu_grids[(height, width)] = (gpu_x, gpu_y)
+            if self._cuda_filters is None:
+                self._cuda_filters = {
+                    'gauss5': cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (5, 5), 0),
+                    'gauss7': cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (7, 7), 0),
+                    'sobel_x': cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 1, 0, ksize=3),
+                    'sobel_y': cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 0, 1, ksize=3),
+                }
+                self._cuda_stream = cv2.cuda_Stream()
+
+    def process_frame(self, frame, vr_out, gray=None):
+        """Depth + stereo for one frame, into the side-by-side buffer"""
+        refresh = self._frame_index % self._depth_every == 0
+        self._frame_index += 1
+        if CUPY_AVAILABLE:
+            return self._process_frame_cupy(frame, vr_out, refresh, gray)
+        if CUDA_AVAILABLE:
+            return self._process_frame_cuda(frame, vr_out, refresh)
+        if refresh or self._last_depth is None:
+            self._last_depth = self.simple_depth_estimation(frame, gray)
+        return self.create_stereo_pair(frame, self._last_depth, vr_out)
+
+    def _process_frame_cupy(self, frame, vr_out, refresh_depth=True, gray=None):
+        """⚡ FUSED GPU RENDER - one kernel launch builds the whole VR frame"""
+
+        height, width = frame.shape[:2]
+
+        # Persistent device buffers, built by _configure once per frame size
+        self._configure(height, width)
+        gpu_frame, gpu_depth, gpu_vr = self._cp_bufs[(height, width)]
+
+        # Depth prior comes from the CPU estimator; the kernel fuses the
+        # disparity math, both eye remaps and the side-by-side concat
+        gpu_frame.set(frame)
+        if refresh_depth or self._last_depth is None:
+            self._last_depth = self.simple_depth_estimation(frame, gray)
+            gpu_depth.set(self._last_depth)
+
+        max_disparity = 15  # Maximum pixel shift for depth effect
+        scale = max_disparity * 0.3 / 255.0
+
+        block = (16, 16)
+        grid = ((width * 2 + block[0] - 1) // block[0],
+                (height + block[1] - 1) // block[1])
+        VR180_RENDER_KERNEL(grid, block,
+                            (gpu_frame, gpu_depth, gpu_vr,
+                             np.int32(width), np.int32(height), np.float32(scale)))
+
+        cp.asnumpy(gpu_vr, out=vr_out)
+        return vr_out
+
+    def _process_frame_cuda(self, frame, vr_out, refresh_depth=True):
+        """🚀 GPU PIPELINE - depth and stereo remap entirely on the CUDA device"""
+
+        height, width = frame.shape[:2]
+
+        # GPU grids, cached filter engines and the work stream all come
+        # prebuilt from _configure; everything below is issued on one stream
+        # so launches are async and uploads overlap in-flight compute
+        self._configure(height, width)
+        gpu_x_base, gpu_y_map = self._gpu_grids[(height, width)]
+        filters = self._cuda_filters
+        stream = self._cuda_stream
+
+        # Upload the decoded frame once; everything below stays on device
+        gpu_frame = cv2.cuda_GpuMat()
+        gpu_frame.upload(frame, stream)
+
+        if refresh_depth or self._last_gpu_depth is None:
+            # Depth estimation on a 4x downsampled frame, mirroring the CPU path
+            small = cv2.cuda.resize(gpu_frame,
+                                    (max(1, width // 4), max(1, height // 4)),
+                                    interpolation=cv2.INTER_AREA, stream=stream)
+            gray = cv2.cuda.cvtColor(small, cv2.COLOR_BGR2GRAY, stream=stream)
+            blurred = filters['gauss5'].apply(gray, stream=stream)
+            grad_x = cv2.cuda.abs(filters['sobel_x'].apply(blurred, stream=stream), stream=stream)
+            grad_y = cv2.cuda.abs(filters['sobel_y'].apply(blurred, stream=stream), stream=stream)
+            gradient_mag = cv2.cuda.addWeighted(grad_x, 0.5, grad_y, 0.5, 0,
+                                                dtype=cv2.CV_8U, stream=stream)
+            depth = cv2.cuda.addWeighted(gradient_mag, 0.7, gray, 0.3, 0, stream=stream)
+            depth = cv2.cuda.normalize(depth, 0, 255, cv2.NORM_MINMAX, cv2.CV_8UC1, stream=stream)
+            depth = filters['gauss7'].apply(depth, stream=stream)
+            depth = cv2.cuda.resize(depth, (width, height),
+                                    interpolation=cv2.INTER_LINEAR, stream=stream)
+
+            # Displacement maps from depth, still on device; cached so the
+            # frames that reuse this depth skip the map arithmetic too
+            max_disparity = 15  # Maximum pixel shift for depth effect
+            scale = max_disparity * 0.3 / 255.0
+            delta = cv2.cuda.multiply(depth, (scale,), dtype=cv2.CV_32F, stream=stream)
+            map_left = cv2.cuda.add(gpu_x_base, delta, stream=stream)
+            map_right = cv2.cuda.subtract(gpu_x_base, delta, stream=stream)
+            self._last_gpu_depth = (map_left, map_right)
+        map_left, map_right = self._last_gpu_depth
+
+        # BORDER_REPLICATE samples the edge pixel for out-of-range x, which
+        # matches the CPU path's clip to [0, width-1]
+        left = cv2.cuda.remap(gpu_frame, map_left, gpu_y_map, cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE, stream=stream)
+        right = cv2.cuda.remap(gpu_frame, map_right, gpu_y_map, cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE, stream=stream)
+
+        # Download only the finished halves into the side-by-side buffer
+        left.download(stream, vr_out[:, :width])
+        right.download(stream, vr_out[:, width:])
+        stream.waitForCompletion()
+        return vr_out
+
+    def simple_depth_estimation(self, frame, gray=None):
         """🧠 DEPTH ESTIMATION ENGINE"""
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
+
+        height, width = frame.shape[:2]
+
+        # Depth only needs luma: take the decoder's Y plane when offered,
+        # otherwise derive grayscale from BGR
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Depth here is a low-frequency prior (blurred gradients + brightness),
+        # so estimate it on a 4x downsampled frame and upsample at the end -
+        # Sobel/blur/normalize then touch only 1/16 of the pixels
+        gray = cv2.resize(gray, (max(1, width // 4), max(1, height // 4)),
+                          interpolation=cv2.INTER_AREA)
+
+        # Reused uint8 intermediates so nothing is allocated per refresh
+        if gray.shape not in self._depth_bufs:
+            self._depth_bufs[gray.shape] = (np.empty_like(gray), np.empty_like(gray))
+        mag_buf, depth_buf = self._depth_bufs[gray.shape]
+
         # Apply Gaussian blur for smoothing
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
+
         # Calculate gradients (edges usually = closer objects)
-        grad_x = cv2.Sobel(blurred, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(blurred, cv2.CV_64F, 0, 1, ksize=3)
-        
-        # Gradient magnitude
-        gradient_mag = np.sqrt(grad_x**2 + grad_y**2)
-        
-        # Brightness factor (brighter usually = closer)
-        brightness_factor = gray.astype(np.float64) / 255.0
-        
-        # Combine gradient and brightness for depth
-        depth = (gradient_mag * 0.7 + brightness_factor * 0.3)
-        
-        # Normalize and smooth
-        depth = cv2.normalize(depth, None, 0, 255, cv2.NORM_MINMAX)
-        depth = cv2.GaussianBlur(depth, (7, 7), 0)
-        
-        return depth.astype(np.uint8)
+        # CV_16S keeps the whole pipeline in small integers - no float64 traffic
+        grad_x = cv2.Sobel(blurred, cv2.CV_16S, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(blurred, cv2.CV_16S, 0, 1, ksize=3)
+
+        # Gradient magnitude (L1 approximation of |gradient|, stays uint8)
+        cv2.addWeighted(
+            cv2.convertScaleAbs(grad_x), 0.5,
+            cv2.convertScaleAbs(grad_y), 0.5, 0, dst=mag_buf
+        )
+
+        # Combine gradient and brightness for depth (brighter usually = closer)
+        cv2.addWeighted(mag_buf, 0.7, gray, 0.3, 0, dst=depth_buf)
+
+        # Normalize and smooth, all in place
+        cv2.normalize(depth_buf, depth_buf, 0, 255, cv2.NORM_MINMAX)
+        cv2.GaussianBlur(depth_buf, (7, 7), 0, dst=depth_buf)
+
+        # Back up to full resolution for the disparity shift
+        return cv2.resize(depth_buf, (width, height), interpolation=cv2.INTER_LINEAR)
     
-    def create_stereo_pair(self, frame, depth_map):
-        """👁️ STEREOSCOPIC PAIR GENERATOR"""
-        
+    def create_stereo_pair(self, frame, depth_map, vr_out):
+        """👁️ STEREOSCOPIC PAIR GENERATOR - renders into the side-by-side buffer"""
+
         height, width = frame.shape[:2]
-        
-        # Normalize depth (0-1 range)
-        depth_norm = depth_map.astype(np.float32) / 255.0
-        
-        # Create disparity map (how much to shift each pixel)
+
+        # Grids and shift buffers come prebuilt from _configure; this is a
+        # no-op unless the frame size changed
+        self._configure(height, width)
+        x_base, y_map = self._grids[(height, width)]
+
+        # Pixel shift per depth level - 0.3 keeps the effect subtle and natural
         max_disparity = 15  # Maximum pixel shift for depth effect
-        disparity = depth_norm * max_disparity
-        
-        # Generate left and right eye views
-        left_eye = self.shift_image(frame, disparity, direction=1)   # Shift right for left eye
-        right_eye = self.shift_image(frame, disparity, direction=-1) # Shift left for right eye
-        
-        return left_eye, right_eye
-    
-    def shift_image(self, image, disparity, direction):
-        """🔄 IMAGE DISPLACEMENT ENGINE"""
-        
-        height, width = image.shape[:2]
-        
-        # Create coordinate grids
-        y_coords, x_coords = np.mgrid[0:height, 0:width]
-        
-        # Apply horizontal shift based on depth
-        x_shifted = x_coords + (disparity * direction * 0.3)  # Subtle shift for natural effect
-        x_shifted = np.clip(x_shifted, 0, width - 1)  # Keep within bounds
-        
-        # Remap the image with new coordinates
-        shifted = cv2.remap(
-            image,
-            x_shifted.astype(np.float32),
-            y_coords.astype(np.float32),
-            cv2.INTER_LINEAR
-        )
-        
-        return shifted
+        scale = max_disparity * 0.3 / 255.0
+
+        if NUMBA_AVAILABLE:
+            # Single parallel pass writing both shift maps cv2.remap consumes
+            build_shift_maps(depth_map, np.float32(scale), self._xL, self._xR, y_map)
+        else:
+            # The left/right shifts are symmetric, so compute delta once -
+            # via the depth->shift LUT - and add/subtract it in place into
+            # the reused shift buffers
+            delta = self._disparity_lut[depth_map]
+            np.add(x_base, delta, out=self._xL)       # Shift right for left eye
+            np.subtract(x_base, delta, out=self._xR)  # Shift left for right eye
+            np.clip(self._xL, 0, width - 1, out=self._xL)  # Keep within bounds
+            np.clip(self._xR, 0, width - 1, out=self._xR)
+
+        # Fixed-point CV_16SC2 maps are half the size of the float32 pair and
+        # remap's documented fast path. The maps depend on this frame's depth,
+        # so the conversion runs per frame - it is a single cheap pass
+        map_left, interp_left = cv2.convertMaps(self._xL, y_map, cv2.CV_16SC2)
+        map_right, interp_right = cv2.convertMaps(self._xR, y_map, cv2.CV_16SC2)
+
+        # Remap each eye directly into its half of the VR frame
+        cv2.remap(frame, map_left, interp_left, cv2.INTER_LINEAR, dst=vr_out[:, :width])
+        cv2.remap(frame, map_right, interp_right, cv2.INTER_LINEAR, dst=vr_out[:, width:])
+
+        return vr_out